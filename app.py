@@ -7,10 +7,69 @@
 # Import required libraries
 import streamlit as st  # For web interface
 import pandas as pd     # For data manipulation and analysis
-from fpdf import FPDF   # For PDF generation
+import numpy as np      # For vectorized numeric calculations
+from fpdf import FPDF   # For PDF generation (fpdf2)
 import io              # For file input/output operations
+import re              # For matching header column names
 import os              # For file system operations
 import base64          # For image encoding
+import hashlib         # For fast hashing of uploaded file contents
+import openpyxl        # For streaming the top rows of Excel sheets
+from concurrent.futures import ThreadPoolExecutor  # For reading sheets in parallel
+from itertools import groupby  # For grouping report lines by formatting
+
+# Pick the fastest available Excel reader
+# calamine (Rust-based) is much faster than openpyxl and only needs to read sheets.
+# pandas' openpyxl reader already opens workbooks in read-only mode, so it is the fallback.
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# Pattern that identifies the header row of a pump data sheet (compiled once)
+_HEADER_RE = re.compile(r"Eff%|Pump Sr\. No")
+
+# Amperage columns (P1, P2) for each test condition
+_AMP_COLS = {
+    '0_bar': ('0 Bar Amp P1', '0 Bar Amp P2'),
+    '200_bar': ('200 Bar Amp P1', '200 Bar Amp P2')
+}
+
+# Efficiency columns (P1, P2)
+_EFF_COLS = ('Eff%P1', 'Eff%P2')
+
+# Boundaries between the 90-92%, 92-94% and 94%+ efficiency ranges
+_EFF_RANGE_EDGES = np.array([92.0, 94.0])
+
+# Every numeric column used by the amperage and efficiency analysis
+_ANALYSIS_COLS = [col for cols in _AMP_COLS.values() for col in cols] + list(_EFF_COLS)
+
+# Columns read from each sheet for the analysis (the raw data view reads them all)
+_NEEDED_COLS = {'Pump Sr. No', *_ANALYSIS_COLS}
+
+# Column types given to the Excel reader (serial numbers are kept as text)
+# Keyed by stripped name; matched against the sheet's own header names when reading.
+# Numeric columns are not listed: placeholders like '-' would make the reader fail,
+# so they are converted after reading instead (see _process_sheet)
+_COLUMN_DTYPES = {'Pump Sr. No': 'string'}
+
+# Record layouts for tandem P1 vs P2 matching results (one record per tandem unit)
+# unit_id is stored as an object so long serial numbers are never truncated
+TANDEM_AMP_DTYPE = np.dtype([
+    ('unit_id', object),
+    ('p1_amp', np.float64),
+    ('p2_amp', np.float64),
+    ('difference', np.float64),
+    ('percentage_diff', np.float64)
+])
+TANDEM_EFF_DTYPE = np.dtype([
+    ('unit_id', object),
+    ('p1_eff', np.float64),
+    ('p2_eff', np.float64),
+    ('difference', np.float64),
+    ('average_eff', np.float64)
+])
 
 # Configure Streamlit page settings
 st.set_page_config(page_title="Smart Pump Test Report", layout="wide")
@@ -49,68 +108,203 @@ else:
 # Display main title
 st.title("🔧 VBC Hydraulics Pump Performance Report Generator")
 
+# =============================================================================
+# HEADER ROW DETECTION FUNCTION
+# =============================================================================
+def _find_header_row(worksheet):
+    """
+    Finds the row containing the pump data column names.
+    
+    Excel files often have company headers above the data, so the column
+    names are not always in the first row. Rows are streamed from the sheet
+    and the search stops at the first match, so the data below the header
+    is never loaded.
+    
+    Args:
+        worksheet: openpyxl worksheet opened in read-only mode
+        
+    Returns:
+        Tuple of (header row index (0-based), header row values),
+        or (None, None) if no header was found
+    """
+    # Some exporters write a stale sheet size (e.g. "A1"); without this only column A would be read
+    worksheet.reset_dimensions()
+    
+    for row_index, row in enumerate(worksheet.iter_rows(values_only=True)):
+        # We look for key columns like "Eff%" or "Pump Sr. No" to identify data start
+        if any(isinstance(value, str) and _HEADER_RE.search(value) for value in row):
+            return row_index, row
+    return None, None
+
+def _find_header_rows(file_bytes):
+    """
+    Finds the header row of every sheet in the Excel file.
+    
+    The workbook is opened once, in read-only mode, for all sheets. This
+    also gives the sheet names, so no other handle is needed to list them.
+    
+    Args:
+        file_bytes: Contents of the Excel file
+        
+    Returns:
+        Dictionary mapping each sheet name (in workbook order) to the
+        (header row index, header row values) from _find_header_row
+    """
+    workbook = openpyxl.load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True, keep_links=False)
+    try:
+        return {sheet_name: _find_header_row(workbook[sheet_name]) for sheet_name in workbook.sheetnames}
+    finally:
+        # Always release the workbook handle, even if reading failed
+        workbook.close()
+
+# =============================================================================
+# SINGLE SHEET READING FUNCTION
+# =============================================================================
+def _process_sheet(file_bytes, sheet_name, header_row, header_names, all_columns=False):
+    """
+    Reads the pump data from one sheet of the Excel file.
+    
+    Each call opens its own copy of the workbook, so several sheets can be
+    read at the same time from different threads. By default only the
+    columns the analysis uses are read, and the numeric ones are converted
+    to numbers; with all_columns=True the whole sheet is read as it is
+    (for the raw data view).
+    
+    Args:
+        file_bytes: Contents of the Excel file
+        sheet_name: Name of the sheet to read
+        header_row: Index of the sheet's header row (see _find_header_rows)
+        header_names: Values of the sheet's header row
+        all_columns: Read every column instead of only the analysis columns
+        
+    Returns:
+        DataFrame with the sheet's pump data
+    """
+    # Step 1: Match the column types to the sheet's header names
+    # The reader matches dtype keys against the exact header text, so key them by
+    # the sheet's own names (which may carry extra spaces) rather than the clean ones
+    column_dtypes = {
+        name: _COLUMN_DTYPES[name.strip()]
+        for name in header_names
+        if isinstance(name, str) and name.strip() in _COLUMN_DTYPES
+    }
+    
+    # Step 2: Read the sheet data, skipping rows until we reach the header
+    with pd.ExcelFile(io.BytesIO(file_bytes), engine=EXCEL_ENGINE) as excel_data:
+        df = pd.read_excel(
+            excel_data,
+            sheet_name=sheet_name,
+            skiprows=header_row,
+            usecols=None if all_columns else (lambda col: str(col).strip() in _NEEDED_COLS),
+            dtype=column_dtypes
+        )
+    
+    # Clean up column names (remove extra spaces)
+    df.columns = df.columns.astype(str).str.strip()
+    
+    if all_columns:
+        return df
+    
+    # Step 3: Convert the analysis columns to numbers
+    # Text such as '-' or 'N/A' becomes NaN, which the analysis already skips
+    for col in _ANALYSIS_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    
+    return df
+
+# =============================================================================
+# PARALLEL SHEET READING FUNCTION
+# =============================================================================
+def _read_sheets(file_bytes, all_columns=False):
+    """
+    Reads every sheet of the Excel file that has a pump data header row.
+    
+    Sheets are read in parallel because Excel parsing is the slowest part.
+    A sheet that fails to read does not stop the others; its error is
+    returned instead.
+    
+    Args:
+        file_bytes: Contents of the Excel file
+        all_columns: Read every column instead of only the analysis columns
+        
+    Returns:
+        sheet_frames: Dictionary mapping sheet names (in workbook order) to DataFrames
+        sheet_errors: Dictionary mapping sheet names to the error raised while reading them
+    """
+    # Step 1: Find the header row of every sheet (e.g., SinglePump, TandemPump, etc.)
+    # This is important because Excel files often have company headers above data
+    header_rows = _find_header_rows(file_bytes)
+    sheets = [sheet_name for sheet_name, (header_row, _) in header_rows.items() if header_row is not None]
+    
+    # Step 2: Read every sheet with a header in parallel
+    max_workers = max(1, min(len(sheets), os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_process_sheet, file_bytes, sheet_name, *header_rows[sheet_name], all_columns)
+            for sheet_name in sheets
+        ]
+    
+    # Step 3: Collect each sheet's result separately
+    sheet_frames = {}
+    sheet_errors = {}
+    for sheet_name, future in zip(sheets, futures):
+        try:
+            sheet_frames[sheet_name] = future.result()
+        except Exception as e:
+            sheet_errors[sheet_name] = e
+    return sheet_frames, sheet_errors
+
 # =============================================================================
 # MAIN DATA ANALYSIS FUNCTION
 # =============================================================================
-def analyze_pump_data(uploaded_file):
+def analyze_pump_data(file_bytes):
     """
     This is the core function that analyzes pump data from Excel files.
     
     How it works:
-    1. Reads all sheets from the Excel file (e.g., SinglePump, TandemPump)
-    2. For each sheet, finds the header row containing column names
+    1. Reads all sheets from the Excel file (e.g., SinglePump, TandemPump) in
+       parallel, starting each one at the header row containing column names
+    2. Skips sheets that have no recognizable header row, and warns about
+       sheets that could not be read (the other sheets are still used)
     3. Determines if pumps are Single or Tandem based on P2 data
     4. Returns organized data structure with pump information
     
     Args:
-        uploaded_file: Excel file uploaded by user through Streamlit
+        file_bytes: Contents of the Excel file uploaded by user through Streamlit
         
     Returns:
         pump_data: Dictionary containing data for each sheet
         total_pumps: Total number of pumps across all sheets
     """
     try:
-        # Step 1: Read all sheet names from the Excel file
-        # This allows us to handle files with multiple sheets (SinglePump, TandemPump, etc.)
-        excel_data = pd.ExcelFile(uploaded_file)
-        sheets = excel_data.sheet_names
+        # Step 1: Read every sheet that has a header row, in parallel
+        # Only the columns used by the analysis are read
+        sheet_frames, sheet_errors = _read_sheets(file_bytes)
+        
+        # Step 2: Report sheets that could not be read
+        # A sheet that fails to read is reported and left out, not the whole file
+        for sheet_name, error in sheet_errors.items():
+            st.warning(f"Skipped sheet '{sheet_name}': {error}")
         
         # Initialize variables to store pump data and count
         pump_data = {}  # Will store data for each sheet
         total_pumps = 0  # Running count of all pumps
         
-        # Step 2: Process each sheet in the Excel file
-        for sheet_name in sheets:
-            # Read the sheet without assuming header location (header=None)
-            # This is important because Excel files often have company headers above data
-            df_raw = pd.read_excel(uploaded_file, sheet_name=sheet_name, header=None)
+        # Step 3: Process each sheet that contained pump data
+        for sheet_name, df in sheet_frames.items():
+            # Step 4: Determine if this is a Single or Tandem pump configuration
+            pump_type = determine_pump_type(df, sheet_name)
             
-            # Step 3: Find the actual header row containing pump data columns
-            # We look for key columns like "Eff%" or "Pump Sr. No" to identify data start
-            header_candidates = df_raw[df_raw.apply(lambda r: r.astype(str).str.contains("Eff%|Pump Sr. No", na=False).any(), axis=1)]
+            # Step 5: Store the processed data for this sheet
+            pump_data[sheet_name] = {
+                'data': df,           # The actual pump test data
+                'type': pump_type,    # 'Single' or 'Tandem'
+                'count': len(df)      # Number of pumps in this sheet
+            }
             
-            # Step 4: If we found a header row, process the data
-            if not header_candidates.empty:
-                header_row = header_candidates.index[0]  # Get the row index
-                
-                # Read the sheet again, but skip rows until we reach the header
-                df = pd.read_excel(uploaded_file, sheet_name=sheet_name, skiprows=header_row)
-                
-                # Clean up column names (remove extra spaces)
-                df.columns = df.columns.astype(str).str.strip()
-                
-                # Step 5: Determine if this is a Single or Tandem pump configuration
-                pump_type = determine_pump_type(df, sheet_name)
-                
-                # Step 6: Store the processed data for this sheet
-                pump_data[sheet_name] = {
-                    'data': df,           # The actual pump test data
-                    'type': pump_type,    # 'Single' or 'Tandem'
-                    'count': len(df)      # Number of pumps in this sheet
-                }
-                
-                # Add to total pump count
-                total_pumps += len(df)
+            # Add to total pump count
+            total_pumps += len(df)
         
         return pump_data, total_pumps
         
@@ -144,23 +338,23 @@ def determine_pump_type(df, sheet_name):
         String: "Single" or "Tandem"
     """
     # Step 1: Check sheet name first (explicit naming)
-    if 'single' in sheet_name.lower():
+    # This avoids scanning the data at all for sheets like "SinglePump" or "TandemPump"
+    name_lower = sheet_name.lower()
+    if 'single' in name_lower:
         return "Single"
-    elif 'tandem' in sheet_name.lower():
+    elif 'tandem' in name_lower:
         return "Tandem"
     
     # Step 2: If sheet name doesn't give clear indication, analyze data
-    # Find P2 efficiency columns
-    p2_columns = [col for col in df.columns if 'P2' in col and 'Eff%P2' in col]
-    
-    if p2_columns:
+    # Check for the P2 efficiency column
+    if 'Eff%P2' in df.columns:
         # Step 3: Count how many pumps have meaningful P2 efficiency data
         # We check for values greater than 0 because 0% efficiency means no operation
-        non_zero_p2_eff = (df['Eff%P2'] > 0).sum() if 'Eff%P2' in df.columns else 0
+        non_zero_p2_eff = int((df['Eff%P2'].to_numpy() > 0).sum())
         
         # Step 4: Decision logic - if more than half the pumps have P2 data, it's Tandem
         # This handles cases where some pumps might have failed P2 tests
-        if non_zero_p2_eff > len(df) * 0.5:
+        if non_zero_p2_eff * 2 > len(df):
             return "Tandem"
         else:
             return "Single"
@@ -169,192 +363,207 @@ def determine_pump_type(df, sheet_name):
         return "Single"
 
 # =============================================================================
-# CORRECTED AMPERAGE ANALYSIS FUNCTION
+# CORRECTED AMPERAGE AND EFFICIENCY ANALYSIS FUNCTION
 # =============================================================================
-def analyze_amperage(pump_data):
+def _unit_ids(df):
+    """
+    Returns an ID for every unit (row) of a sheet.
+    
+    Units are identified by their pump serial number. Units without one
+    (or every unit, if the sheet has no serial number column) are named
+    by position instead: Unit_1, Unit_2, ...
+    
+    Args:
+        df: DataFrame containing pump data for one sheet
+        
+    Returns:
+        NumPy object array with one ID per row of df
     """
-    CORRECTED: Analyzes amperage with proper tandem pump logic.
+    if 'Pump Sr. No' in df.columns:
+        unit_ids = df['Pump Sr. No'].to_numpy(dtype=object, na_value=None)
+    else:
+        unit_ids = np.full(len(df), None, dtype=object)
+    
+    # Only build fallback names for the units that need one
+    missing = np.flatnonzero(pd.isna(unit_ids))
+    unit_ids[missing] = [f'Unit_{idx+1}' for idx in missing]
+    return unit_ids
+
+def analyze_all(pump_data):
+    """
+    CORRECTED: Analyzes amperage and efficiency with proper tandem pump logic.
+    
+    Both analyses run in a single pass over the sheets: the amperage and
+    efficiency columns of each sheet are pulled out as NumPy arrays once
+    and every calculation works on those arrays.
     
-    For Single Pumps: Normal min/max analysis
+    For Single Pumps: Normal amperage min/max + individual pump efficiencies
     For Tandem Pumps: Analyze P1 vs P2 matching + combined performance
     
     Key Changes:
-    - Tandem pumps counted as UNITS (not individual pumps)
-    - P1 vs P2 matching analysis for quality control
-    - Mismatch detection for tandem pairs
+    - Tandem pumps counted as UNITS (not individual pumps) for amperage
+    - Separate tracking for individual pumps vs units for efficiency
+    - P1 vs P2 matching analysis and mismatch detection for tandem pairs
     
     Args:
         pump_data: Dictionary containing data from all sheets
         
     Returns:
         amp_analysis: Dictionary with min/max/count + tandem analysis
+                      (tandem analysis is a NumPy record array, see TANDEM_AMP_DTYPE)
+        efficiency_ranges: Dictionary with counts for each efficiency range
+        total_individual_pumps: Total number of individual pump readings
+        tandem_matching_analysis: Record array of tandem P1 vs P2 comparisons (see TANDEM_EFF_DTYPE)
     """
-    # Step 1: Initialize data structure with tandem analysis capability
+    # Step 1: Initialize amperage data structure with tandem analysis capability
     amp_analysis = {
         '0_bar': {'min': float('inf'), 'max': 0, 'unit_count': 0, 'tandem_analysis': []},
         '200_bar': {'min': float('inf'), 'max': 0, 'unit_count': 0, 'tandem_analysis': []}
     }
     
-    # Step 2: Process each sheet of pump data
+    # Step 2: Initialize efficiency tracking
+    # Readings from every sheet are gathered first and categorized together at the end
+    all_efficiencies = []          # List of NumPy arrays (one or two per sheet)
+    tandem_matching_analysis = []  # List of record arrays with P1 vs P2 comparisons
+    total_individual_pumps = 0     # Count of individual pump readings
+    
+    # Step 3: Process each sheet of pump data
+    p1_eff_col, p2_eff_col = _EFF_COLS
     for sheet_name, sheet_data in pump_data.items():
         df = sheet_data['data']  # Get the actual data
         pump_type = sheet_data['type']  # Single or Tandem
         
+        # Pull every column the analysis needs out of the DataFrame once
+        sheet_columns = set(df.columns)
+        columns = {
+            col: df[col].to_numpy(dtype=np.float64)
+            for col in _ANALYSIS_COLS if col in sheet_columns
+        }
+        
         if pump_type == "Single":
-            # Step 3: Handle Single Pumps (original logic)
-            for condition in ['0_bar', '200_bar']:
-                # Fix: Properly construct column names
-                if condition == '0_bar':
-                    col_name = '0 Bar Amp P1'
-                else:  # 200_bar
-                    col_name = '200 Bar Amp P1'
-                
-                if col_name in df.columns:
+            # Step 4: Handle Single Pumps (original logic)
+            # Single pumps only use the P1 amperage column
+            for condition, (col_name, _) in _AMP_COLS.items():
+                if col_name in columns:
                     # Find non-zero values for min/max calculation
-                    non_zero_values = df[df[col_name] > 0][col_name]
-                    if not non_zero_values.empty:
+                    non_zero_values = columns[col_name]
+                    non_zero_values = non_zero_values[non_zero_values > 0]
+                    if non_zero_values.size:
                         amp_analysis[condition]['min'] = min(amp_analysis[condition]['min'], non_zero_values.min())
                         amp_analysis[condition]['max'] = max(amp_analysis[condition]['max'], non_zero_values.max())
                     
                     # Count units (each row = 1 unit for single pumps)
                     amp_analysis[condition]['unit_count'] += len(df)
+            
+            # Step 4a: Collect individual pump efficiencies
+            if p1_eff_col in columns:
+                valid_efficiencies = columns[p1_eff_col]
+                valid_efficiencies = valid_efficiencies[valid_efficiencies > 0]
+                all_efficiencies.append(valid_efficiencies)
+                
+                # Count individual pumps
+                total_individual_pumps += len(valid_efficiencies)
         
-        else:  # Step 4: Handle Tandem Pumps (NEW LOGIC)
+        else:  # Step 5: Handle Tandem Pumps (NEW LOGIC)
             # For tandem pumps: each row is ONE unit with TWO pumps
-            for condition in ['0_bar', '200_bar']:
-                # Fix: Properly construct column names
-                if condition == '0_bar':
-                    p1_col = '0 Bar Amp P1'
-                    p2_col = '0 Bar Amp P2'
-                else:  # 200_bar
-                    p1_col = '200 Bar Amp P1'
-                    p2_col = '200 Bar Amp P2'
-                
-                if p1_col in df.columns and p2_col in df.columns:
-                    # Step 4a: Analyze each tandem unit (row)
-                    for idx, row in df.iterrows():
-                        p1_amp = row[p1_col]
-                        p2_amp = row[p2_col]
+            unit_ids = _unit_ids(df)
+            for condition, (p1_col, p2_col) in _AMP_COLS.items():
+                if p1_col in columns and p2_col in columns:
+                    # Step 5a: Analyze all tandem units (rows) at once
+                    # Only units where both P1 and P2 drew current are compared
+                    p1 = columns[p1_col]
+                    p2 = columns[p2_col]
+                    mask = (p1 > 0) & (p2 > 0)
+                    
+                    if mask.any():
+                        p1_amps = p1[mask]
+                        p2_amps = p2[mask]
+                        
+                        # Step 5b: Analyze P1 vs P2 amperage matching for quality control
+                        higher_amps = np.maximum(p1_amps, p2_amps)  # Also used for the overall maximum
+                        differences = np.abs(p1_amps - p2_amps)
+                        percentage_diffs = differences / higher_amps * 100
+                        
+                        # Store tandem matching analysis (one record per unit, filled column by column)
+                        records = np.empty(len(p1_amps), dtype=TANDEM_AMP_DTYPE)
+                        records['unit_id'] = unit_ids[mask]
+                        records['p1_amp'] = p1_amps
+                        records['p2_amp'] = p2_amps
+                        records['difference'] = differences
+                        records['percentage_diff'] = percentage_diffs
+                        amp_analysis[condition]['tandem_analysis'].append(records)
                         
-                        # Step 4b: Analyze P1 vs P2 matching for quality control
-                        if p1_amp > 0 and p2_amp > 0:
-                            difference = abs(p1_amp - p2_amp)
-                            percentage_diff = (difference / max(p1_amp, p2_amp)) * 100
-                            
-                            # Store tandem matching analysis
-                            amp_analysis[condition]['tandem_analysis'].append({
-                                'unit_id': row.get('Pump Sr. No', f'Unit_{idx+1}'),
-                                'p1_amp': p1_amp,
-                                'p2_amp': p2_amp,
-                                'difference': difference,
-                                'percentage_diff': percentage_diff
-                            })
-                            
-                            # Step 4c: Update min/max with both P1 and P2 values
-                            amp_analysis[condition]['min'] = min(amp_analysis[condition]['min'], p1_amp, p2_amp)
-                            amp_analysis[condition]['max'] = max(amp_analysis[condition]['max'], p1_amp, p2_amp)
+                        # Step 5c: Update min/max with both P1 and P2 values
+                        # (the lower/higher pump of each unit, without building a combined array)
+                        amp_analysis[condition]['min'] = min(amp_analysis[condition]['min'], np.minimum(p1_amps, p2_amps).min())
+                        amp_analysis[condition]['max'] = max(amp_analysis[condition]['max'], higher_amps.max())
                     
-                    # Step 4d: Count UNITS (not individual pumps)
+                    # Step 5d: Count UNITS (not individual pumps)
                     amp_analysis[condition]['unit_count'] += len(df)
+            
+            # Step 5e: Analyze both P1 and P2 efficiencies, plus matching
+            if p1_eff_col in columns and p2_eff_col in columns:
+                p1 = columns[p1_eff_col]
+                p2 = columns[p2_eff_col]
+                mask = (p1 > 0) & (p2 > 0)
+                p1_effs = p1[mask]
+                p2_effs = p2[mask]
+                
+                # Analyze P1 vs P2 efficiency matching for quality control
+                differences = np.abs(p1_effs - p2_effs)
+                average_effs = (p1_effs + p2_effs) / 2
+                
+                # Store tandem matching analysis (one record per unit, filled column by column)
+                records = np.empty(len(p1_effs), dtype=TANDEM_EFF_DTYPE)
+                records['unit_id'] = unit_ids[mask]
+                records['p1_eff'] = p1_effs
+                records['p2_eff'] = p2_effs
+                records['difference'] = differences
+                records['average_eff'] = average_effs
+                tandem_matching_analysis.append(records)
+                
+                # Each tandem unit contributes 2 individual pump readings
+                all_efficiencies.append(p1_effs)
+                all_efficiencies.append(p2_effs)
+                
+                # Count individual pumps (2 per tandem unit)
+                total_individual_pumps += 2 * len(p1_effs)
     
-    # Step 5: Handle edge case where no valid readings were found
-    for condition in ['0_bar', '200_bar']:
+    # Step 6: Handle edge case where no valid amperage readings were found
+    for condition in _AMP_COLS:
         if amp_analysis[condition]['min'] == float('inf'):
             amp_analysis[condition]['min'] = 0
+        
+        # Combine the tandem records from all sheets into one array
+        tandem_parts = amp_analysis[condition]['tandem_analysis']
+        amp_analysis[condition]['tandem_analysis'] = (
+            np.concatenate(tandem_parts) if tandem_parts else np.empty(0, dtype=TANDEM_AMP_DTYPE)
+        )
     
-    return amp_analysis
-
-# =============================================================================
-# CORRECTED EFFICIENCY DISTRIBUTION ANALYSIS FUNCTION
-# =============================================================================
-def analyze_efficiency_distribution(pump_data):
-    """
-    CORRECTED: Analyzes efficiency with proper tandem pump logic.
-    
-    For Single Pumps: Count individual pump efficiencies
-    For Tandem Pumps: Analyze P1 vs P2 matching + individual performance
-    
-    Key Changes:
-    - Separate tracking for individual pumps vs units
-    - P1 vs P2 matching analysis for tandem pumps
-    - Quality control metrics for tandem pairs
+    # Step 7: Categorize all efficiency values in one pass
+    # Values below 90% are not counted; the rest get a range index from the 92% and 94% boundaries
+    # (side="right" puts values exactly on a boundary into the higher range)
+    counts = [0, 0, 0]
+    if all_efficiencies:
+        efficiencies = np.concatenate(all_efficiencies)
+        efficiencies = efficiencies[efficiencies >= 90]
+        range_index = np.searchsorted(_EFF_RANGE_EDGES, efficiencies, side="right")
+        counts = np.bincount(range_index, minlength=3)
     
-    Args:
-        pump_data: Dictionary containing data from all sheets
-        
-    Returns:
-        efficiency_ranges: Dictionary with counts for each efficiency range
-        total_individual_pumps: Total number of individual pump readings
-        tandem_matching_analysis: List of tandem P1 vs P2 comparisons
-    """
-    # Step 1: Initialize counters for efficiency ranges
     efficiency_ranges = {
-        '90_to_92': 0,    # 90% ≤ efficiency < 92%
-        '92_to_94': 0,    # 92% ≤ efficiency < 94%
-        '94_plus': 0      # efficiency ≥ 94%
+        '90_to_92': int(counts[0]),    # 90% ≤ efficiency < 92%
+        '92_to_94': int(counts[1]),    # 92% ≤ efficiency < 94%
+        '94_plus': int(counts[2])      # efficiency ≥ 94%
     }
     
-    # Step 2: Initialize tandem analysis tracking
-    tandem_matching_analysis = []  # List to store P1 vs P2 comparisons
-    total_individual_pumps = 0     # Count of individual pump readings
-    
-    # Step 3: Process each sheet of pump data
-    for sheet_name, sheet_data in pump_data.items():
-        df = sheet_data['data']  # Get the actual data
-        pump_type = sheet_data['type']  # Single or Tandem
-        
-        if pump_type == "Single":
-            # Step 4: Handle Single Pumps (normal efficiency counting)
-            if 'Eff%P1' in df.columns:
-                valid_efficiencies = df[df['Eff%P1'] > 0]['Eff%P1']
-                
-                # Categorize each efficiency value
-                for eff in valid_efficiencies:
-                    if 90 <= eff < 92:
-                        efficiency_ranges['90_to_92'] += 1
-                    elif 92 <= eff < 94:
-                        efficiency_ranges['92_to_94'] += 1
-                    elif eff >= 94:
-                        efficiency_ranges['94_plus'] += 1
-                
-                # Count individual pumps
-                total_individual_pumps += len(valid_efficiencies)
-        
-        else:  # Step 5: Handle Tandem Pumps (NEW LOGIC)
-            # For tandem pumps: analyze both P1 and P2, plus matching
-            for idx, row in df.iterrows():
-                p1_eff = row.get('Eff%P1', 0)
-                p2_eff = row.get('Eff%P2', 0)
-                
-                if p1_eff > 0 and p2_eff > 0:
-                    # Step 5a: Analyze P1 vs P2 matching for quality control
-                    difference = abs(p1_eff - p2_eff)
-                    average_eff = (p1_eff + p2_eff) / 2
-                    
-                    # Store tandem matching analysis
-                    tandem_matching_analysis.append({
-                        'unit_id': row.get('Pump Sr. No', f'Unit_{idx+1}'),
-                        'p1_eff': p1_eff,
-                        'p2_eff': p2_eff,
-                        'difference': difference,
-                        'average_eff': average_eff
-                    })
-                    
-                    # Step 5b: Count individual pump efficiencies
-                    # Each tandem unit contributes 2 individual pump readings
-                    for eff in [p1_eff, p2_eff]:
-                        if 90 <= eff < 92:
-                            efficiency_ranges['90_to_92'] += 1
-                        elif 92 <= eff < 94:
-                            efficiency_ranges['92_to_94'] += 1
-                        elif eff >= 94:
-                            efficiency_ranges['94_plus'] += 1
-                    
-                    # Count individual pumps (2 per tandem unit)
-                    total_individual_pumps += 2
+    # Combine the tandem efficiency records from all sheets into one array
+    if tandem_matching_analysis:
+        tandem_matching_analysis = np.concatenate(tandem_matching_analysis)
+    else:
+        tandem_matching_analysis = np.empty(0, dtype=TANDEM_EFF_DTYPE)
     
-    # Step 6: Return results with tandem analysis
-    return efficiency_ranges, total_individual_pumps, tandem_matching_analysis
+    # Step 8: Return amperage and efficiency results with tandem analysis
+    return amp_analysis, efficiency_ranges, total_individual_pumps, tandem_matching_analysis
 
 # =============================================================================
 # REPORT CONTENT GENERATION FUNCTION
@@ -374,7 +583,7 @@ def generate_report_content(pump_data, total_pumps, amp_analysis, efficiency_ran
         amp_analysis: Dictionary with amperage statistics + tandem analysis
         efficiency_ranges: Dictionary with efficiency distribution
         total_efficiency_readings: Total efficiency values analyzed
-        tandem_matching_analysis: List of tandem P1 vs P2 comparisons
+        tandem_matching_analysis: Record array of tandem P1 vs P2 comparisons
         
     Returns:
         String containing the complete formatted report
@@ -427,16 +636,16 @@ def generate_report_content(pump_data, total_pumps, amp_analysis, efficiency_ran
                 report_lines.append(f"  Maximum amperage: {amp_analysis[condition]['max']:.2f} A")
             
             # Add tandem matching analysis if available
-            if amp_analysis[condition]['tandem_analysis']:
-                mismatched_units = [unit for unit in amp_analysis[condition]['tandem_analysis'] 
-                                  if unit['percentage_diff'] > 10]  # 10% threshold for mismatch
+            tandem_units = amp_analysis[condition]['tandem_analysis']
+            if len(tandem_units):
+                mismatched_units = tandem_units[tandem_units['percentage_diff'] > 10]  # 10% threshold for mismatch
                 
                 report_lines.append(f"  Tandem pump matching analysis:")
-                report_lines.append(f"    - Total tandem units: {len(amp_analysis[condition]['tandem_analysis'])}")
+                report_lines.append(f"    - Total tandem units: {len(tandem_units)}")
                 report_lines.append(f"    - Units with >10% P1/P2 difference: {len(mismatched_units)}")
                 
-                if mismatched_units:
-                    worst_mismatch = max(mismatched_units, key=lambda x: x['percentage_diff'])
+                if len(mismatched_units):
+                    worst_mismatch = mismatched_units[np.argmax(mismatched_units['percentage_diff'])]
                     report_lines.append(f"    - Worst mismatch: {worst_mismatch['percentage_diff']:.1f}% (Unit {worst_mismatch['unit_id']})")
                 else:
                     report_lines.append(f"    - All tandem units within 10% tolerance")
@@ -459,24 +668,23 @@ def generate_report_content(pump_data, total_pumps, amp_analysis, efficiency_ran
     report_lines.append(f"94% and above: {efficiency_ranges['94_plus']} pumps")
     
     # Add tandem efficiency matching analysis
-    if tandem_matching_analysis and has_tandem:
+    if tandem_matching_analysis is not None and len(tandem_matching_analysis) and has_tandem:
         report_lines.append("")
         report_lines.append("TANDEM PUMP MATCHING (P1 vs P2):")
         report_lines.append("-" * 33)
         
-        if tandem_matching_analysis:
-            avg_differences = [unit['difference'] for unit in tandem_matching_analysis]
-            avg_diff = sum(avg_differences) / len(avg_differences)
+        if len(tandem_matching_analysis):
+            avg_diff = tandem_matching_analysis['difference'].mean()
             
             report_lines.append(f"Total tandem units analyzed: {len(tandem_matching_analysis)}")
             report_lines.append(f"Average efficiency difference: {avg_diff:.2f}%")
             
             # Count units with significant efficiency differences
-            mismatched_eff_units = [unit for unit in tandem_matching_analysis if unit['difference'] > 3]
+            mismatched_eff_units = tandem_matching_analysis[tandem_matching_analysis['difference'] > 3]
             report_lines.append(f"Units with >3% efficiency difference: {len(mismatched_eff_units)}")
             
-            if mismatched_eff_units:
-                worst_eff_mismatch = max(mismatched_eff_units, key=lambda x: x['difference'])
+            if len(mismatched_eff_units):
+                worst_eff_mismatch = mismatched_eff_units[np.argmax(mismatched_eff_units['difference'])]
                 report_lines.append(f"Worst efficiency mismatch: {worst_eff_mismatch['difference']:.2f}% (Unit {worst_eff_mismatch['unit_id']})")
             else:
                 report_lines.append("All tandem units within 3% efficiency tolerance")
@@ -484,9 +692,36 @@ def generate_report_content(pump_data, total_pumps, amp_analysis, efficiency_ran
     # Join all report lines into a single string with newlines
     return "\n".join(report_lines)
 
+# =============================================================================
+# PDF LINE FORMATTING FUNCTION
+# =============================================================================
+def _pdf_line_style(line):
+    """
+    Decides how a line of the text report is formatted in the PDF.
+    
+    Args:
+        line: One line of the report content
+        
+    Returns:
+        String: "blank", "title", "rule", "header", "underline" or "body"
+    """
+    if not line:
+        return "blank"
+    elif line.startswith("PUMP PERFORMANCE TEST REPORT"):
+        return "title"
+    elif line.startswith("="):
+        return "rule"
+    elif line.endswith(":") and not line.startswith(" "):
+        return "header"
+    elif line.startswith("-"):
+        return "underline"
+    else:
+        return "body"
+
 # =============================================================================
 # PDF REPORT GENERATION FUNCTION
 # =============================================================================
+@st.cache_data(show_spinner=False, max_entries=8)
 def create_pdf_report(report_content, customer_name, pump_identifier):
     """
     Creates a professional PDF report from the text content.
@@ -497,6 +732,8 @@ def create_pdf_report(report_content, customer_name, pump_identifier):
     3. Formats the report content with appropriate fonts and styling
     4. Returns the PDF as bytes for download
     
+    Results are cached, so the same report is only rendered once.
+    
     Args:
         report_content: String containing the formatted report text
         customer_name: Customer name for the header
@@ -518,48 +755,104 @@ def create_pdf_report(report_content, customer_name, pump_identifier):
         pdf.image(logo_path, 10, 8, 33)  # x=10, y=8, width=33
     
     # Step 3: Add company name header
-    pdf.set_font("Arial", "B", 16)  # Bold, 16pt font
-    pdf.cell(200, 10, company_name, ln=True, align="C")  # Centered
+    pdf.set_font("Helvetica", "B", 16)  # Bold, 16pt font
+    pdf.cell(200, 10, company_name, new_x="LMARGIN", new_y="NEXT", align="C")  # Centered
     pdf.ln(5)  # Add some space
     
     # Step 4: Add customer information
-    pdf.set_font("Arial", "", 12)  # Regular, 12pt font
-    pdf.cell(200, 10, f"Customer: {customer_name}", ln=True)
-    pdf.cell(200, 10, f"Pump Identifier: {pump_identifier}", ln=True)
+    pdf.set_font("Helvetica", "", 12)  # Regular, 12pt font
+    pdf.cell(200, 10, f"Customer: {customer_name}", new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(200, 10, f"Pump Identifier: {pump_identifier}", new_x="LMARGIN", new_y="NEXT")
     pdf.ln(10)  # Add more space before report content
     
     # Step 5: Process and add report content
-    pdf.set_font("Arial", "", 10)  # Regular, 10pt font for body text
+    pdf.set_font("Helvetica", "", 10)  # Regular, 10pt font for body text
     
     # Split the report content into individual lines for processing
     lines = report_content.split('\n')
     
-    # Process each line with appropriate formatting
-    for line in lines:
-        if line.startswith("PUMP PERFORMANCE TEST REPORT"):
+    # Process runs of consecutive lines that share the same formatting
+    for style, group in groupby(lines, key=_pdf_line_style):
+        group = list(group)
+        
+        if style == "blank":
+            # Empty lines - same height as a regular content line
+            pdf.ln(5 * len(group))
+        elif style == "title":
             # Main title - larger, bold, centered
-            pdf.set_font("Arial", "B", 14)
-            pdf.cell(200, 8, line, ln=True, align="C")
-            pdf.set_font("Arial", "", 10)  # Reset to normal font
-        elif line.startswith("="):
+            pdf.set_font("Helvetica", "B", 14)
+            for line in group:
+                pdf.cell(200, 8, line, new_x="LMARGIN", new_y="NEXT", align="C")
+            pdf.set_font("Helvetica", "", 10)  # Reset to normal font
+        elif style == "rule":
             # Decorative lines - just add some space
-            pdf.ln(2)
-        elif line.endswith(":") and not line.startswith(" "):
+            pdf.ln(2 * len(group))
+        elif style == "header":
             # Section headers - bold
-            pdf.set_font("Arial", "B", 11)
-            pdf.cell(200, 6, line, ln=True)
-            pdf.set_font("Arial", "", 10)  # Reset to normal font
-        elif line.startswith("-"):
+            pdf.set_font("Helvetica", "B", 11)
+            for line in group:
+                pdf.cell(200, 6, line, new_x="LMARGIN", new_y="NEXT")
+            pdf.set_font("Helvetica", "", 10)  # Reset to normal font
+        elif style == "underline":
             # Underlines - just add minimal space
-            pdf.ln(1)
+            pdf.ln(len(group))
         else:
-            # Regular content lines
-            pdf.cell(200, 5, line, ln=True)
+            # Regular content lines - written together in one block
+            pdf.multi_cell(0, 5, "\n".join(group), align="L", new_x="LMARGIN", new_y="NEXT")
     
     # Step 6: Return PDF as bytes for download
-    # The 'dest="S"' parameter returns the PDF as a string instead of saving to file
-    # encode("latin-1") converts it to bytes format required by Streamlit
-    return pdf.output(dest="S").encode("latin-1")
+    # fpdf2 writes the PDF bytes straight into the buffer (no intermediate string copy)
+    buffer = io.BytesIO()
+    pdf.output(buffer)
+    return buffer.getvalue()
+
+# =============================================================================
+# CACHED ANALYSIS FUNCTION
+# =============================================================================
+# Uploaded files are cached on a fast hash of their contents
+_FILE_HASH_FUNCS = {bytes: lambda b: hashlib.blake2b(b, digest_size=16).digest()}
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs=_FILE_HASH_FUNCS)
+def _load_and_analyze(file_bytes):
+    """
+    Reads and analyzes an uploaded Excel file, caching the results.
+    
+    Streamlit reruns the whole script on every widget interaction (typing in
+    a text box, ticking a checkbox, clicking a button). Results are cached on
+    the file contents, so the same file is only parsed and analyzed once.
+    
+    Args:
+        file_bytes: Contents of the Excel file uploaded by user through Streamlit
+        
+    Returns:
+        pump_data, total_pumps: See analyze_pump_data
+        amp_analysis, efficiency_ranges, total_efficiency_readings,
+        tandem_matching_analysis: See analyze_all (None/0 if no pump data was found)
+    """
+    pump_data, total_pumps = analyze_pump_data(file_bytes)
+    
+    if not pump_data or total_pumps == 0:
+        return pump_data, total_pumps, None, None, 0, None
+    
+    amp_analysis, efficiency_ranges, total_efficiency_readings, tandem_matching_analysis = analyze_all(pump_data)
+    return pump_data, total_pumps, amp_analysis, efficiency_ranges, total_efficiency_readings, tandem_matching_analysis
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs=_FILE_HASH_FUNCS)
+def _load_raw_data(file_bytes):
+    """
+    Reads every column of each pump data sheet, for the "Show Raw Data" view.
+    
+    The analysis only reads the columns it uses, so the full sheets are
+    read here instead, and only once the user asks to see them.
+    
+    Args:
+        file_bytes: Contents of the Excel file uploaded by user through Streamlit
+        
+    Returns:
+        Dictionary mapping each sheet name to its full DataFrame
+    """
+    sheet_frames, _ = _read_sheets(file_bytes, all_columns=True)
+    return sheet_frames
 
 # =============================================================================
 # STREAMLIT USER INTERFACE
@@ -589,20 +882,22 @@ if uploaded_file:
     st.subheader("📊 Smart Analysis Results")
     
     # --- STEP 1: ANALYZE THE UPLOADED DATA ---
-    # Call our main analysis function to process the Excel file
-    pump_data, total_pumps = analyze_pump_data(uploaded_file)
+    # Process the Excel file and run amperage analysis (min/max for 0 bar and 200 bar)
+    # and efficiency distribution analysis (90-92%, 92-94%, 94%+), both with tandem matching
+    # (pass the raw bytes so results can be cached between reruns)
+    (
+        pump_data,
+        total_pumps,
+        amp_analysis,
+        efficiency_ranges,
+        total_efficiency_readings,
+        tandem_matching_analysis
+    ) = _load_and_analyze(uploaded_file.getvalue())
     
     # Check if we successfully extracted pump data
     if pump_data and total_pumps > 0:
         
-        # --- STEP 2: PERFORM DETAILED ANALYSIS ---
-        # Run amperage analysis (min/max for 0 bar and 200 bar + tandem matching)
-        amp_analysis = analyze_amperage(pump_data)
-        
-        # Run efficiency distribution analysis (90-92%, 92-94%, 94%+ + tandem matching)
-        efficiency_ranges, total_efficiency_readings, tandem_matching_analysis = analyze_efficiency_distribution(pump_data)
-        
-        # --- STEP 3: GENERATE WRITTEN REPORT ---
+        # --- STEP 2: GENERATE WRITTEN REPORT ---
         # Create formatted text report with all analysis results (including tandem analysis)
         report_content = generate_report_content(
             pump_data, 
@@ -613,19 +908,22 @@ if uploaded_file:
             tandem_matching_analysis  # Pass tandem analysis results
         )
         
-        # --- STEP 4: DISPLAY REPORT TO USER ---
+        # --- STEP 3: DISPLAY REPORT TO USER ---
         # Show the generated report in a text area (scrollable, read-only)
         st.text_area("Report Content", report_content, height=400)
         
-        # --- STEP 5: OPTIONAL RAW DATA DISPLAY ---
+        # --- STEP 4: OPTIONAL RAW DATA DISPLAY ---
         # Provide checkbox to show underlying data if user wants to see details
         if st.checkbox("Show Raw Data"):
+            # The full sheets (every column) are only read when asked for
+            raw_data = _load_raw_data(uploaded_file.getvalue())
+            
             # Display data from each sheet separately
             for sheet_name, sheet_data in pump_data.items():
                 st.subheader(f"📋 {sheet_name} Data ({sheet_data['type']} Pump)")
-                st.dataframe(sheet_data['data'])  # Display as interactive table
+                st.dataframe(raw_data.get(sheet_name, sheet_data['data']))  # Display as interactive table
         
-        # --- STEP 6: PDF EXPORT FUNCTIONALITY ---
+        # --- STEP 5: PDF EXPORT FUNCTIONALITY ---
         # Provide button to generate and download PDF report
         if st.button("📥 Export PDF Report"):
             # Generate PDF with current report content and customer info